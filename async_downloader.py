@@ -0,0 +1,176 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, Dict, Any, AsyncIterator, Iterable, Tuple
+
+from tik_tok_downloader import TikTokDownloader
+
+
+class DownloadResult:
+    def __init__(self, url: str, path: Optional[str] = None, video_id: Optional[str] = None,
+                 size: int = 0, description: Optional[str] = None, error: Optional[str] = None,
+                 elapsed: float = 0.0, skipped: bool = False,
+                 postprocess: Optional[Dict[str, Any]] = None):
+        """
+        Outcome of a single download
+
+        Args:
+            url (str): Requested URL
+            path (Optional[str]): Location of the stored video, None on failure
+            video_id (Optional[str]): TikTok video ID
+            size (int): Bytes downloaded
+            description (Optional[str]): Video description if known
+            error (Optional[str]): Error message on failure
+            elapsed (float): Seconds spent on the download
+            skipped (bool): The video was already stored and not downloaded again
+            postprocess (Optional[Dict[str, Any]]): Result of the post-processing job,
+                with its own 'error' key, None when nothing was post-processed
+        """
+        self.url = url
+        self.path = path
+        self.video_id = video_id
+        self.size = size
+        self.description = description
+        self.error = error
+        self.elapsed = elapsed
+        self.skipped = skipped
+        self.postprocess = postprocess
+
+    @property
+    def success(self) -> bool:
+        return self.error is None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'url': self.url,
+            'path': self.path,
+            'id': self.video_id,
+            'size': self.size,
+            'description': self.description,
+            'error': self.error,
+            'elapsed': self.elapsed,
+            'skipped': self.skipped,
+            'postprocess': self.postprocess,
+        }
+
+    def __repr__(self) -> str:
+        status = self.path if self.success else f"error={self.error!r}"
+        return f"DownloadResult({self.url!r}, {status})"
+
+
+class AsyncTikTokDownloader:
+    def __init__(self, max_concurrency: int = 4, **downloader_options):
+        """
+        Asyncio wrapper around TikTokDownloader for embedding in services
+
+        yt-dlp and Selenium run in a dedicated thread pool, so the event loop
+        never blocks on them, and status output is replaced by DownloadResult
+        objects.
+
+        Args:
+            max_concurrency (int): Maximum number of downloads running at once
+            **downloader_options: Arguments passed on to TikTokDownloader
+        """
+        downloader_options.setdefault('quiet', True)
+        self.downloader = TikTokDownloader(**downloader_options)
+        self.max_concurrency = max(1, max_concurrency)
+        self.executor = ThreadPoolExecutor(max_workers=self.max_concurrency,
+                                           thread_name_prefix='tiktok-download')
+        self.semaphore: Optional[asyncio.Semaphore] = None
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the running loop on older Python versions
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self.semaphore
+
+    def _run(self, url: str, cancel_event: threading.Event,
+             postprocess: bool) -> Tuple[DownloadResult, Optional[Future]]:
+        """Blocking download executed in a worker thread"""
+        start = time.perf_counter()
+        try:
+            result = self.downloader.fetch_video(url, postprocess=postprocess, cancel_event=cancel_event)
+            return DownloadResult(url, path=result['path'], video_id=result['id'], size=result['size'],
+                                  description=result['description'], skipped=result['skipped'],
+                                  elapsed=time.perf_counter() - start), result['postprocess']
+        except Exception as e:
+            return DownloadResult(url, error=str(e), elapsed=time.perf_counter() - start), None
+
+    async def download(self, url: str, postprocess: bool = True) -> DownloadResult:
+        """
+        Download a single video
+
+        Cancelling the calling task stops waiting immediately and aborts the
+        underlying transfer at its next progress update, or between chunks
+        of a segmented download. When the downloader has a post-processor,
+        its result is awaited outside the concurrency limit, so the next
+        download starts while ffmpeg runs.
+
+        Args:
+            url (str): URL of the TikTok video
+            postprocess (bool): Run the downloader's post-processor on this video, if it has one
+
+        Returns:
+            DownloadResult: Outcome of the download, errors included
+        """
+        loop = asyncio.get_running_loop()
+        cancel_event = threading.Event()
+        async with self._get_semaphore():
+            future = loop.run_in_executor(self.executor, self._run, url, cancel_event, postprocess)
+            try:
+                result, postprocess_future = await future
+            except asyncio.CancelledError:
+                cancel_event.set()
+                raise
+        if postprocess_future is not None:
+            try:
+                result.postprocess = await asyncio.wrap_future(postprocess_future)
+            except Exception as e:
+                result.postprocess = {'path': result.path, 'error': str(e)}
+        return result
+
+    async def download_many(self, urls: Iterable[str], postprocess: bool = True) -> AsyncIterator[DownloadResult]:
+        """
+        Download many videos, yielding results as they complete
+
+        Only a bounded number of URLs is scheduled at a time, so very long
+        URL lists don't create a task per URL up front. Closing the iterator
+        early cancels the downloads still in flight.
+
+        Args:
+            urls (Iterable[str]): URLs of TikTok videos
+            postprocess (bool): Run the downloader's post-processor on these videos, if it has one
+
+        Yields:
+            DownloadResult: Outcome of each download, in completion order
+        """
+        url_iter = iter(urls)
+        pending = set()
+        try:
+            while True:
+                while len(pending) < self.max_concurrency * 2:
+                    url = next(url_iter, None)
+                    if url is None:
+                        break
+                    pending.add(asyncio.ensure_future(self.download(url, postprocess)))
+                if not pending:
+                    break
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def close(self) -> None:
+        """Wait for running downloads and release the worker threads and storage sink"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.executor.shutdown, True)
+        await loop.run_in_executor(None, self.downloader.close)
+
+    async def __aenter__(self) -> 'AsyncTikTokDownloader':
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        await self.close()
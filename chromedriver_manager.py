@@ -1,13 +1,21 @@
+import logging
 import os
 import platform
 import subprocess
+import threading
 import re
 import zipfile
 import shutil
 import requests
 import json
 from pathlib import Path
+from tracing import span, traced
 
+# Library module: output only shows up once the application configures logging
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+@traced()
 def get_chrome_version():
     """Get the installed Chrome version"""
     system = platform.system().lower()
@@ -31,7 +39,7 @@ def get_chrome_version():
             if version:
                 return version.group(1)
     except Exception as e:
-        print(f"Error getting Chrome version: {e}")
+        logger.warning(f"Error getting Chrome version: {e}")
     
     # Fallback: Try to get version from registry on Windows
     if system == "windows":
@@ -41,7 +49,7 @@ def get_chrome_version():
             version, _ = winreg.QueryValueEx(key, "version")
             return version
         except Exception as e:
-            print(f"Error getting Chrome version from registry: {e}")
+            logger.warning(f"Error getting Chrome version from registry: {e}")
     
     return None
 
@@ -51,11 +59,12 @@ def get_major_version(version):
         return version.split('.')[0]
     return None
 
+@traced()
 def download_chromedriver(chrome_version):
     """Download the appropriate ChromeDriver version"""
     major_version = get_major_version(chrome_version)
     if not major_version:
-        print("Could not determine Chrome major version")
+        logger.warning("Could not determine Chrome major version")
         return False
     
     # Get the latest ChromeDriver version for this Chrome major version
@@ -73,7 +82,7 @@ def download_chromedriver(chrome_version):
                 matching_versions.append(version_info)
         
         if not matching_versions:
-            print(f"No matching ChromeDriver found for Chrome version {chrome_version}")
+            logger.warning(f"No matching ChromeDriver found for Chrome version {chrome_version}")
             return False
         
         # Sort by version and get the latest
@@ -102,11 +111,11 @@ def download_chromedriver(chrome_version):
                 break
         
         if not download_url:
-            print(f"Could not find download URL for ChromeDriver {version} on {system} {architecture}")
+            logger.warning(f"Could not find download URL for ChromeDriver {version} on {system} {architecture}")
             return False
         
         # Download and extract the ChromeDriver
-        print(f"Downloading ChromeDriver version {version} for Chrome {chrome_version}...")
+        logger.info(f"Downloading ChromeDriver version {version} for Chrome {chrome_version}...")
         response = requests.get(download_url, stream=True)
         zip_path = os.path.join(os.path.dirname(__file__), "chromedriver_download.zip")
         
@@ -134,7 +143,7 @@ def download_chromedriver(chrome_version):
                 break
         
         if not chromedriver_exec:
-            print("Could not find chromedriver executable in the downloaded package")
+            logger.warning("Could not find chromedriver executable in the downloaded package")
             return False
         
         # Determine the destination directory
@@ -149,7 +158,7 @@ def download_chromedriver(chrome_version):
             else:
                 dest_dir = os.path.join(base_path, "chromedriver-mac-x64")
         else:
-            print(f"Unsupported operating system: {system}")
+            logger.warning(f"Unsupported operating system: {system}")
             return False
         
         # Ensure the destination directory exists
@@ -168,23 +177,32 @@ def download_chromedriver(chrome_version):
             os.remove(zip_path)
             shutil.rmtree(extract_dir)
         except Exception as e:
-            print(f"Warning: Could not clean up temporary files: {e}")
+            logger.warning(f"Could not clean up temporary files: {e}")
         
-        print(f"Successfully installed ChromeDriver {version} to {dest_path}")
+        logger.info(f"Successfully installed ChromeDriver {version} to {dest_path}")
         return True
         
     except Exception as e:
-        print(f"Error downloading ChromeDriver: {e}")
+        logger.warning(f"Error downloading ChromeDriver: {e}")
         return False
 
+# Downloader threads share the download zip and extract directory, so only one may check/install at a time
+_install_lock = threading.Lock()
+
+@traced()
 def ensure_compatible_chromedriver():
-    """Ensure that a compatible ChromeDriver is available"""
+    """Ensure that a compatible ChromeDriver is available, safe to call from several threads"""
+    with _install_lock:
+        return _ensure_compatible_chromedriver()
+
+def _ensure_compatible_chromedriver():
+    """Check the installed ChromeDriver against Chrome, downloading a matching one if needed"""
     chrome_version = get_chrome_version()
     if not chrome_version:
-        print("Could not determine Chrome version. Please download ChromeDriver manually.")
+        logger.warning("Could not determine Chrome version. Please download ChromeDriver manually.")
         return False
     
-    print(f"Detected Chrome version: {chrome_version}")
+    logger.info(f"Detected Chrome version: {chrome_version}")
     
     # Check if we need to download a new ChromeDriver
     system = platform.system().lower()
@@ -201,18 +219,19 @@ def ensure_compatible_chromedriver():
         else:
             driver_path = os.path.join(base_path, "chromedriver-mac-x64", "chromedriver")
     else:
-        print(f"Unsupported operating system: {system}")
+        logger.warning(f"Unsupported operating system: {system}")
         return False
     
     # If ChromeDriver doesn't exist, download it
     if not os.path.exists(driver_path):
-        print("ChromeDriver not found. Downloading...")
+        logger.info("ChromeDriver not found. Downloading...")
         return download_chromedriver(chrome_version)
     
     # Try to get the version of the existing ChromeDriver
     try:
         cmd = [driver_path, "--version"]
-        process = subprocess.run(cmd, capture_output=True, text=True)
+        with span("chromedriver_version_check"):
+            process = subprocess.run(cmd, capture_output=True, text=True)
         driver_version_match = re.search(r'ChromeDriver\s+(\d+\.\d+\.\d+)', process.stdout)
         if driver_version_match:
             driver_version = driver_version_match.group(1)
@@ -220,17 +239,18 @@ def ensure_compatible_chromedriver():
             chrome_major = chrome_version.split('.')[0]
             
             if driver_major == chrome_major:
-                print(f"ChromeDriver version {driver_version} is compatible with Chrome version {chrome_version}")
+                logger.info(f"ChromeDriver version {driver_version} is compatible with Chrome version {chrome_version}")
                 return True
             else:
-                print(f"ChromeDriver version {driver_version} is not compatible with Chrome version {chrome_version}. Downloading compatible version...")
+                logger.info(f"ChromeDriver version {driver_version} is not compatible with Chrome version {chrome_version}. Downloading compatible version...")
                 return download_chromedriver(chrome_version)
     except Exception as e:
-        print(f"Error checking ChromeDriver version: {e}")
+        logger.warning(f"Error checking ChromeDriver version: {e}")
     
     # If we couldn't determine the version or there was an error, download a new one to be safe
-    print("Could not verify ChromeDriver version. Downloading compatible version...")
+    logger.warning("Could not verify ChromeDriver version. Downloading compatible version...")
     return download_chromedriver(chrome_version)
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
     ensure_compatible_chromedriver()
@@ -0,0 +1,163 @@
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Any, Iterable
+
+import yt_dlp
+
+from quality import estimate_best_size
+
+
+def summarize_info(url: str, info: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Reduce a yt-dlp info dictionary to a manifest record
+
+    Args:
+        url (str): Requested URL
+        info (Dict[str, Any]): Info dictionary returned by yt-dlp
+
+    Returns:
+        Dict[str, Any]: Manifest record
+    """
+    formats = [
+        {
+            'format_id': f.get('format_id'),
+            'ext': f.get('ext'),
+            'width': f.get('width'),
+            'height': f.get('height'),
+            'tbr': f.get('tbr'),
+            'vcodec': f.get('vcodec'),
+            'filesize': f.get('filesize') or f.get('filesize_approx'),
+        }
+        for f in info.get('formats') or []
+    ]
+    size = info.get('filesize') or info.get('filesize_approx')
+    return {
+        'url': url,
+        'id': info.get('id'),
+        'description': info.get('description') or info.get('title'),
+        'author': info.get('uploader') or info.get('creator') or info.get('channel'),
+        'author_id': info.get('uploader_id'),
+        'timestamp': info.get('timestamp'),
+        'duration': info.get('duration'),
+        'format_id': info.get('format_id'),
+        'size_estimate': int(size) if size else None,
+        'size_is_exact': bool(info.get('filesize')),
+        'best_size_estimate': estimate_best_size(info),
+        'formats': formats,
+    }
+
+
+class ManifestExporter:
+    def __init__(self, downloader, workers: int = 8):
+        """
+        Extract metadata for many URLs concurrently without downloading media
+
+        Args:
+            downloader (TikTokDownloader): Downloader providing cookies, headers and quality profile
+            workers (int): Number of concurrent extractions
+        """
+        self.downloader = downloader
+        self.workers = max(1, workers)
+        self.local = threading.local()
+        # Every per-thread instance, closed when the export finishes
+        self.instances = []
+        self.lock = threading.Lock()
+
+    def _get_ydl(self) -> yt_dlp.YoutubeDL:
+        """Get the YoutubeDL instance of the current worker thread"""
+        ydl = getattr(self.local, 'ydl', None)
+        if ydl is None:
+            ydl_opts = self.downloader.get_ydl_options()
+            self.downloader.quality.apply(ydl_opts)
+            ydl_opts.update({
+                'quiet': True,
+                'no_warnings': True,
+                'skip_download': True,
+                'progress_hooks': [],
+            })
+            ydl = yt_dlp.YoutubeDL(ydl_opts)
+            self.local.ydl = ydl
+            with self.lock:
+                self.instances.append(ydl)
+        return ydl
+
+    def close(self) -> None:
+        """Close the per-thread YoutubeDL instances, saving their cookies and releasing connections"""
+        with self.lock:
+            instances, self.instances = self.instances, []
+        for ydl in instances:
+            ydl.close()
+        self.local = threading.local()
+
+    def extract(self, url: str) -> Dict[str, Any]:
+        """
+        Extract the manifest record of a single URL
+
+        Args:
+            url (str): TikTok video URL
+
+        Returns:
+            Dict[str, Any]: Manifest record, with an 'error' key on failure
+        """
+        if not self.downloader.validate_url(url):
+            return {'url': url, 'error': 'Invalid TikTok URL'}
+        try:
+            info = self._get_ydl().extract_info(url, download=False)
+            return summarize_info(url, info or {})
+        except Exception as e:
+            return {'url': url, 'error': str(e)}
+
+    def export(self, urls: Iterable[str], output_path: str) -> int:
+        """
+        Write a JSONL manifest, one line per URL in completion order
+
+        Records are flushed as soon as they arrive, and at most a few
+        URLs per worker are in flight, so memory stays flat for very long
+        URL lists and an interrupted export keeps everything written so far.
+
+        Args:
+            urls (Iterable[str]): URLs to inspect
+            output_path (str): Path of the JSONL manifest
+
+        Returns:
+            int: Number of failed extractions
+        """
+        directory = os.path.dirname(output_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        failures = 0
+        written = 0
+        url_iter = iter(urls)
+        max_pending = self.workers * 4
+        try:
+            with open(output_path, 'w', encoding='utf-8') as f, \
+                    ThreadPoolExecutor(max_workers=self.workers) as executor:
+                pending = set()
+                exhausted = False
+                while pending or not exhausted:
+                    while not exhausted and len(pending) < max_pending:
+                        url = next(url_iter, None)
+                        if url is None:
+                            exhausted = True
+                        else:
+                            pending.add(executor.submit(self.extract, url))
+                    if not pending:
+                        break
+
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        record = future.result()
+                        if 'error' in record:
+                            failures += 1
+                        f.write(json.dumps(record, ensure_ascii=False) + '\n')
+                        written += 1
+                    f.flush()
+                    print(f"Manifest: {written} written, {failures} failed", end='\r')
+        finally:
+            self.close()
+
+        print(f"\nManifest written to {output_path} ({written} entries, {failures} failed)")
+        return failures
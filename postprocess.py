@@ -0,0 +1,175 @@
+import os
+import shutil
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor, Future
+from typing import Optional, Dict, Any, List
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+OPERATIONS = ('remux', 'transcode', 'thumbnail')
+
+
+def _windows_cpu_time(process: subprocess.Popen) -> float:
+    """Read the CPU time of an exited child from its still open process handle"""
+    import ctypes
+    from ctypes import wintypes
+
+    creation, exit_time, kernel, user = (wintypes.FILETIME() for _ in range(4))
+    if not ctypes.windll.kernel32.GetProcessTimes(wintypes.HANDLE(int(process._handle)), ctypes.byref(creation),
+                                                  ctypes.byref(exit_time), ctypes.byref(kernel), ctypes.byref(user)):
+        return 0.0
+    # FILETIME counts 100 ns intervals
+    return sum(((t.dwHighDateTime << 32) | t.dwLowDateTime) / 1e7 for t in (kernel, user))
+
+
+def _run_ffmpeg(ffmpeg: str, args: List[str]) -> float:
+    """
+    Run ffmpeg and measure the CPU time of the ffmpeg process itself
+
+    os.times() reports no child times on Windows, so the child is measured
+    with getrusage(RUSAGE_CHILDREN) on POSIX and GetProcessTimes on Windows.
+
+    Returns:
+        float: CPU seconds (user + system) used by ffmpeg
+    """
+    cmd = [ffmpeg, '-hide_banner', '-loglevel', 'error', '-y'] + args
+    if resource is not None:
+        before = resource.getrusage(resource.RUSAGE_CHILDREN)
+        process = subprocess.run(cmd, capture_output=True, text=True)
+        after = resource.getrusage(resource.RUSAGE_CHILDREN)
+        returncode, stderr = process.returncode, process.stderr
+        cpu_time = (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)
+    else:
+        with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True) as process:
+            _, stderr = process.communicate()
+            returncode = process.returncode
+            cpu_time = _windows_cpu_time(process)
+    if returncode != 0:
+        raise RuntimeError(stderr.strip() or f"ffmpeg exited with code {returncode}")
+    return cpu_time
+
+
+def run_postprocess(file_path: str, operations: List[str], ffmpeg: str = 'ffmpeg') -> Dict[str, Any]:
+    """
+    Run ffmpeg jobs on a downloaded video inside a worker process
+
+    remux rewrites the container as MP4 with the index at the front,
+    transcode re-encodes to H.264/AAC MP4, thumbnail extracts a JPEG frame
+    next to the video. The video is replaced atomically.
+
+    Args:
+        file_path (str): Path of the downloaded video
+        operations (List[str]): Operations from OPERATIONS
+        ffmpeg (str): ffmpeg executable
+
+    Returns:
+        Dict[str, Any]: Result with path, cpu_time, wall_time and error if any
+    """
+    start_wall = time.perf_counter()
+    start_cpu = time.process_time()
+    result = {'path': file_path, 'operations': operations, 'error': None}
+    stem = os.path.splitext(file_path)[0]
+    # Not a video extension, so --verify never mistakes it for a broken download
+    temp_path = f"{stem}.pp.tmp"
+    ffmpeg_cpu = 0.0
+    try:
+        if 'transcode' in operations:
+            ffmpeg_cpu += _run_ffmpeg(ffmpeg, ['-i', file_path, '-c:v', 'libx264', '-preset', 'medium', '-crf', '23',
+                                               '-c:a', 'aac', '-b:a', '128k', '-movflags', '+faststart',
+                                               '-f', 'mp4', temp_path])
+            os.replace(temp_path, file_path)
+        elif 'remux' in operations:
+            ffmpeg_cpu += _run_ffmpeg(ffmpeg, ['-i', file_path, '-c', 'copy', '-movflags', '+faststart',
+                                               '-f', 'mp4', temp_path])
+            os.replace(temp_path, file_path)
+        if 'thumbnail' in operations:
+            thumbnail_path = f"{stem}.jpg"
+            ffmpeg_cpu += _run_ffmpeg(ffmpeg, ['-ss', '1', '-i', file_path, '-frames:v', '1', '-q:v', '3',
+                                               thumbnail_path])
+            result['thumbnail'] = thumbnail_path
+    except Exception as e:
+        result['error'] = str(e)
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    # ffmpeg time plus the worker's own overhead
+    result['cpu_time'] = ffmpeg_cpu + (time.process_time() - start_cpu)
+    result['wall_time'] = time.perf_counter() - start_wall
+    return result
+
+
+class PostProcessor:
+    def __init__(self, operations: List[str], workers: Optional[int] = None, ffmpeg: Optional[str] = None,
+                 quiet: bool = False):
+        """
+        Post-process downloaded videos in a process pool
+
+        Jobs are submitted as soon as a download finishes and run in the
+        background, so the next download proceeds while ffmpeg uses the CPU.
+
+        Args:
+            operations (List[str]): Operations from OPERATIONS
+            workers (Optional[int]): Pool size, CPU count by default
+            ffmpeg (Optional[str]): ffmpeg executable, looked up on PATH by default
+            quiet (bool): Don't print per-job results and the summary
+        """
+        unknown = [operation for operation in operations if operation not in OPERATIONS]
+        if unknown:
+            raise ValueError(f"Unknown post-processing operation: {', '.join(unknown)}")
+        self.ffmpeg = ffmpeg or shutil.which('ffmpeg')
+        if not self.ffmpeg:
+            raise RuntimeError("Post-processing requires ffmpeg on PATH")
+        self.operations = list(operations)
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        self.futures: List[Future] = []
+        self.quiet = quiet
+
+    def submit(self, file_path: str) -> Future:
+        """
+        Queue a video for post-processing
+
+        Args:
+            file_path (str): Path of the downloaded video
+
+        Returns:
+            Future: Future resolving to the result of run_postprocess
+        """
+        future = self.executor.submit(run_postprocess, file_path, self.operations, self.ffmpeg)
+        future.add_done_callback(self._report)
+        self.futures.append(future)
+        return future
+
+    def _report(self, future: Future) -> None:
+        if self.quiet:
+            return
+        try:
+            result = future.result()
+        except Exception as e:
+            print(f"\nPost-processing failed: {str(e)}")
+            return
+        if result['error']:
+            print(f"\nPost-processing failed for {result['path']}: {result['error']}")
+        else:
+            print(f"\nPost-processed {result['path']} ({', '.join(result['operations'])}): "
+                  f"CPU {result['cpu_time']:.1f}s, wall {result['wall_time']:.1f}s")
+
+    def close(self) -> List[Dict[str, Any]]:
+        """
+        Wait for every queued job and print a summary unless quiet
+
+        Returns:
+            List[Dict[str, Any]]: Results of all jobs
+        """
+        self.executor.shutdown(wait=True)
+        results = [future.result() for future in self.futures if future.exception() is None]
+        if results and not self.quiet:
+            total_cpu = sum(result['cpu_time'] for result in results)
+            failed = sum(1 for result in results if result['error'])
+            print(f"\nPost-processed {len(results) - failed} file(s) on {self.workers} worker(s), "
+                  f"{failed} failed, total CPU {total_cpu:.1f}s")
+        return results
@@ -0,0 +1,137 @@
+from typing import Optional, Dict, Any
+
+# Named presets, any field can be overridden from the command line
+QUALITY_PROFILES: Dict[str, Dict[str, Any]] = {
+    'best': {},
+    '1080p': {'max_height': 1080},
+    '720p': {'max_height': 720},
+    '480p': {'max_height': 480, 'max_bitrate': 1500},
+    'archive': {'max_height': 720, 'max_bitrate': 1200, 'codec': 'h265'},
+}
+
+# yt-dlp reports TikTok codecs under several names
+CODEC_ALIASES = {
+    'h264': 'h264',
+    'avc1': 'h264',
+    'h265': 'h265',
+    'hevc': 'h265',
+    'bytevc1': 'h265',
+}
+
+# Regex matching every vcodec name of a canonical codec
+CODEC_PATTERNS = {
+    'h264': '^(h264|avc1)',
+    'h265': '^(h265|hevc|bytevc1)',
+}
+
+
+class QualityProfile:
+    def __init__(self, max_height: Optional[int] = None, max_bitrate: Optional[int] = None,
+                 max_filesize: Optional[int] = None, codec: Optional[str] = None):
+        """
+        Constraints used to pick a rendition instead of always taking 'best'
+
+        Args:
+            max_height (Optional[int]): Maximum video height in pixels
+            max_bitrate (Optional[int]): Maximum total bitrate in kbps
+            max_filesize (Optional[int]): Maximum file size in bytes
+            codec (Optional[str]): Preferred video codec ('h264' or 'h265')
+        """
+        if codec and codec not in CODEC_ALIASES:
+            raise ValueError(f"Unknown codec: {codec}")
+        self.max_height = max_height
+        self.max_bitrate = max_bitrate
+        self.max_filesize = max_filesize
+        self.codec = CODEC_ALIASES[codec] if codec else None
+
+    @classmethod
+    def from_name(cls, name: str, **overrides) -> 'QualityProfile':
+        """
+        Build a profile from a named preset
+
+        Args:
+            name (str): Key of QUALITY_PROFILES
+            **overrides: Fields replacing the preset values when not None
+
+        Returns:
+            QualityProfile: Configured profile
+        """
+        if name not in QUALITY_PROFILES:
+            raise ValueError(f"Unknown quality profile: {name}")
+        settings = dict(QUALITY_PROFILES[name])
+        settings.update({key: value for key, value in overrides.items() if value is not None})
+        return cls(**settings)
+
+    def format_selector(self) -> str:
+        """
+        Build the yt-dlp format selector for this profile
+
+        The codec preference is expressed as a first alternative restricted
+        to that codec rather than through format_sort, so yt-dlp keeps its
+        default format order and estimate_best_size stays comparable. When
+        no rendition satisfies the constraints, 'worst' is the last fallback,
+        so a video is still downloaded without exceeding the limits more than
+        necessary. The '?' makes a filter pass when yt-dlp doesn't know the
+        field for a format.
+
+        Returns:
+            str: Format selector string
+        """
+        filters = ''
+        if self.max_height:
+            filters += f'[height<=?{self.max_height}]'
+        if self.max_bitrate:
+            filters += f'[tbr<=?{self.max_bitrate}]'
+        if self.max_filesize:
+            filters += f'[filesize<=?{self.max_filesize}][filesize_approx<=?{self.max_filesize}]'
+
+        alternatives = []
+        if self.codec:
+            alternatives.append(f"best[vcodec~='{CODEC_PATTERNS[self.codec]}']{filters}")
+        if filters:
+            alternatives.append(f'best{filters}')
+            alternatives.append('worst')
+        else:
+            alternatives.append('best')
+        return '/'.join(alternatives)
+
+    def apply(self, ydl_opts: Dict[str, Any]) -> None:
+        """
+        Add the format options for this profile to yt-dlp options
+
+        Args:
+            ydl_opts (Dict[str, Any]): yt-dlp options to update in place
+        """
+        ydl_opts['format'] = self.format_selector()
+
+
+def estimate_best_size(info: Dict[str, Any]) -> Optional[int]:
+    """
+    Estimate how many bytes the 'best' format would have cost
+
+    Profiles never change yt-dlp's sort order, so info['formats'] is in the
+    default worst-to-best order and 'best' is the last format carrying both
+    audio and video.
+
+    Args:
+        info (Dict[str, Any]): Info dictionary returned by yt-dlp
+
+    Returns:
+        Optional[int]: Size in bytes or None if unknown
+    """
+    formats = info.get('formats') or []
+    combined = [f for f in formats if f.get('vcodec') != 'none' and f.get('acodec') != 'none']
+    candidates = combined or formats
+    if not candidates:
+        candidates = [info]
+    size = candidates[-1].get('filesize') or candidates[-1].get('filesize_approx')
+    return int(size) if size else None
+
+
+def human_size(size: float) -> str:
+    """Format a byte count for display"""
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if abs(size) < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
@@ -0,0 +1,248 @@
+import argparse
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_EXCEPTION
+from typing import Optional, Dict, List, Tuple, Callable
+
+import requests
+
+from quality import human_size
+from tracing import span
+
+
+class RangeNotSupported(Exception):
+    """Raised when the server ignores Range requests"""
+
+
+class SegmentedDownloader:
+    def __init__(self, connections: int = 4, segment_size: int = 4 * 1024 * 1024,
+                 retries: int = 3, timeout: int = 30, quiet: bool = False,
+                 cancel_check: Optional[Callable[[], None]] = None):
+        """
+        Download a single file over several connections using byte ranges
+
+        Args:
+            connections (int): Number of concurrent connections
+            segment_size (int): Size in bytes of each range request
+            retries (int): Attempts per segment before giving up
+            timeout (int): Socket timeout in seconds
+            quiet (bool): Don't print progress
+            cancel_check (Optional[Callable[[], None]]): Called between chunks,
+                raises to abort the download
+        """
+        self.connections = max(1, connections)
+        self.segment_size = max(64 * 1024, segment_size)
+        self.retries = max(1, retries)
+        self.timeout = timeout
+        self.quiet = quiet
+        self.cancel_check = cancel_check
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.done_bytes = 0
+        # Set once a segment fails so the remaining segments don't start requests
+        self.stop = threading.Event()
+
+    def _session(self, headers: Dict[str, str], cookies) -> requests.Session:
+        """Get the requests session of the current worker thread"""
+        session = getattr(self.local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.headers.update(headers)
+            if cookies is not None:
+                session.cookies.update(cookies)
+            self.local.session = session
+        return session
+
+    def probe(self, url: str, headers: Dict[str, str], cookies=None) -> int:
+        """
+        Get the total size of a resource if the server honours Range requests
+
+        Args:
+            url (str): Media URL
+            headers (Dict[str, str]): HTTP headers
+            cookies: Cookie jar sent with the request
+
+        Returns:
+            int: Total size in bytes
+
+        Raises:
+            RangeNotSupported: If the server doesn't answer with a usable 206
+        """
+        response = self._session(headers, cookies).get(
+            url, headers={'Range': 'bytes=0-0'}, stream=True, timeout=self.timeout)
+        try:
+            response.raise_for_status()
+            content_range = response.headers.get('Content-Range', '')
+            match = re.match(r'bytes\s+0-0/(\d+)', content_range)
+            if response.status_code != 206 or not match:
+                raise RangeNotSupported(f"Server answered {response.status_code} without a usable Content-Range")
+            return int(match.group(1))
+        finally:
+            response.close()
+
+    def _progress(self, size: int, total: int) -> None:
+        """Count downloaded bytes, printing only when the whole percentage changes"""
+        with self.lock:
+            previous = self.done_bytes * 100 // total if total else 0
+            self.done_bytes += size
+            percent = self.done_bytes * 100 // total if total else 0
+            if percent != previous and not self.quiet:
+                print(f"Downloading: {percent}% of {human_size(total)} "
+                      f"over {self.connections} connections", end='\r')
+
+    def _fetch_segment(self, url: str, headers: Dict[str, str], cookies, part_path: str,
+                       start: int, end: int, total: int) -> None:
+        """Download bytes start..end (inclusive) into their place in the part file"""
+        last_error = None
+        for _ in range(self.retries):
+            if self.stop.is_set():
+                return
+            written = 0
+            try:
+                response = self._session(headers, cookies).get(
+                    url, headers={'Range': f'bytes={start}-{end}'}, stream=True, timeout=self.timeout)
+                with response:
+                    response.raise_for_status()
+                    if response.status_code != 206 or not response.headers.get('Content-Range', '').startswith(f'bytes {start}-'):
+                        raise RangeNotSupported(f"Range {start}-{end} not honoured")
+                    with open(part_path, 'r+b') as f:
+                        f.seek(start)
+                        for chunk in response.iter_content(chunk_size=64 * 1024):
+                            if self.stop.is_set():
+                                return
+                            if self.cancel_check:
+                                self.cancel_check()
+                            f.write(chunk)
+                            written += len(chunk)
+                            self._progress(len(chunk), total)
+                if written != end - start + 1:
+                    raise IOError(f"Segment {start}-{end} incomplete: {written} bytes")
+                return
+            except RangeNotSupported:
+                raise
+            except (requests.RequestException, IOError) as e:
+                # Forget the partial segment in the progress count and retry
+                self._progress(-written, total)
+                last_error = e
+        raise IOError(f"Segment {start}-{end} failed after {self.retries} attempts: {last_error}")
+
+    def _single_stream(self, url: str, headers: Dict[str, str], cookies, part_path: str) -> int:
+        """Download the whole resource over one connection"""
+        response = self._session(headers, cookies).get(url, stream=True, timeout=self.timeout)
+        with response:
+            response.raise_for_status()
+            total = int(response.headers.get('Content-Length') or 0)
+            with open(part_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    if self.cancel_check:
+                        self.cancel_check()
+                    f.write(chunk)
+                    self._progress(len(chunk), total)
+        return os.path.getsize(part_path)
+
+    def split(self, total: int) -> List[Tuple[int, int]]:
+        """
+        Split a resource into inclusive byte ranges of segment_size
+
+        Args:
+            total (int): Total size in bytes
+
+        Returns:
+            List[Tuple[int, int]]: (start, end) pairs
+        """
+        return [(start, min(start + self.segment_size, total) - 1)
+                for start in range(0, total, self.segment_size)]
+
+    def download(self, url: str, output_path: str, headers: Optional[Dict[str, str]] = None,
+                 cookies=None) -> int:
+        """
+        Download a resource to output_path, in segments when possible
+
+        Falls back to a single stream when the server doesn't honour Range
+        requests or the file is smaller than two segments. The data is
+        written to output_path + '.part' and only renamed once complete.
+
+        Args:
+            url (str): Media URL
+            output_path (str): Destination file
+            headers (Optional[Dict[str, str]]): HTTP headers
+            cookies: Cookie jar sent with every request
+
+        Returns:
+            int: Number of bytes downloaded
+        """
+        headers = headers or {}
+        part_path = output_path + '.part'
+        self.local = threading.local()
+        self.done_bytes = 0
+        self.stop = threading.Event()
+        start_time = time.perf_counter()
+
+        try:
+            try:
+                total = self.probe(url, headers, cookies)
+            except RangeNotSupported:
+                total = 0
+
+            if self.connections == 1 or total < 2 * self.segment_size:
+                with span("single_stream_download", url=url):
+                    size = self._single_stream(url, headers, cookies, part_path)
+            else:
+                with open(part_path, 'wb') as f:
+                    f.truncate(total)
+                segments = self.split(total)
+                try:
+                    with span("segmented_download", url=url, segments=len(segments)):
+                        executor = ThreadPoolExecutor(max_workers=self.connections)
+                        try:
+                            futures = [executor.submit(self._fetch_segment, url, headers, cookies,
+                                                       part_path, start, end, total)
+                                       for start, end in segments]
+                            done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+                            for future in done:
+                                future.result()
+                        finally:
+                            # On the first failure or cancellation, drop the queued segments
+                            # and make the running ones stop at their next chunk
+                            self.stop.set()
+                            executor.shutdown(wait=True, cancel_futures=True)
+                    size = total
+                except RangeNotSupported:
+                    if not self.quiet:
+                        print("\nServer stopped honouring ranges, retrying as a single stream")
+                    self.done_bytes = 0
+                    with span("single_stream_download", url=url):
+                        size = self._single_stream(url, headers, cookies, part_path)
+        except BaseException:
+            # Never leave a file with holes behind for another downloader to resume
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            raise
+
+        os.replace(part_path, output_path)
+        elapsed = time.perf_counter() - start_time
+        speed = size / elapsed if elapsed else 0
+        if not self.quiet:
+            print(f"\nDownloaded {human_size(size)} in {elapsed:.1f}s ({human_size(speed)}/s)")
+        return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure segmented download throughput for a URL")
+    parser.add_argument('url', help="URL of the file to download, e.g. from a local benchmark server")
+    parser.add_argument('--output', '-o', default='segmented_download.bin', help="Destination file")
+    parser.add_argument('--connections', '-c', type=int, default=4, help="Number of concurrent connections")
+    parser.add_argument('--segment-size', type=float, default=4, help="Segment size in MB")
+    args = parser.parse_args()
+
+    downloader = SegmentedDownloader(
+        connections=args.connections,
+        segment_size=int(args.segment_size * 1024 * 1024)
+    )
+    downloader.download(args.url, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+import os
+import re
+import shutil
+import tarfile
+import threading
+import zipfile
+from datetime import datetime, timezone
+from typing import Optional, Dict
+
+LAYOUTS = ('flat', 'id', 'date')
+SINKS = ('local', 'tar', 'zip', 's3')
+
+
+def extract_video_id(name: str) -> Optional[str]:
+    """
+    Extract the numeric TikTok video ID from a URL or a generated filename
+
+    Args:
+        name (str): Video URL or filename such as tiktok_<id>.mp4
+
+    Returns:
+        Optional[str]: Video ID or None if not found
+    """
+    # Real IDs are 19-digit snowflakes; requiring a whole ID keeps the
+    # tiktok_<YYYYmmdd_HHMMSS> names of short links from matching
+    match = re.search(r'/video/(\d{15,})|tiktok_(\d{15,})(?:_\d+)?\.', name)
+    if match:
+        return match.group(1) or match.group(2)
+    return None
+
+
+def video_id_date(video_id: str) -> Optional[datetime]:
+    """
+    Get the upload date encoded in a TikTok video ID
+
+    TikTok IDs are snowflake-style: the upper 32 bits hold the creation time
+    as a Unix timestamp.
+
+    Args:
+        video_id (str): Numeric TikTok video ID
+
+    Returns:
+        Optional[datetime]: Upload date or None if the ID can't be decoded
+    """
+    try:
+        return datetime.fromtimestamp(int(video_id) >> 32, tz=timezone.utc)
+    except (ValueError, OverflowError, OSError):
+        return None
+
+
+def shard_directory(filename: str, layout: str = 'flat', video_id: Optional[str] = None) -> str:
+    """
+    Get the relative directory a file should be stored in for a given layout
+
+    Layouts:
+        flat: everything in the root of the output directory
+        id:   two levels keyed on the last four digits of the video ID
+              (the leading digits are a timestamp, so they barely vary)
+        date: year/month/day taken from the video ID, or today as fallback
+
+    Args:
+        filename (str): Name of the file being stored
+        layout (str): One of LAYOUTS
+        video_id (Optional[str]): Video ID, extracted from filename if omitted
+
+    Returns:
+        str: Relative directory ('' for the root)
+    """
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown layout: {layout}")
+    if layout == 'flat':
+        return ''
+
+    video_id = video_id or extract_video_id(filename)
+    if layout == 'id':
+        if not video_id:
+            return 'unknown'
+        suffix = video_id[-4:].rjust(4, '0')
+        return os.path.join(suffix[:2], suffix[2:])
+
+    date = video_id_date(video_id) if video_id else None
+    date = date or datetime.now()
+    return os.path.join(date.strftime('%Y'), date.strftime('%m'), date.strftime('%d'))
+
+
+class StorageSink:
+    """Base class for destinations downloaded files are committed to"""
+
+    def exists(self, relative_path: str) -> bool:
+        """
+        Check whether a file is already stored under the given name
+
+        Args:
+            relative_path (str): Path relative to the sink root
+
+        Returns:
+            bool: True if the name is taken
+        """
+        raise NotImplementedError
+
+    def locate(self, relative_path: str) -> str:
+        """
+        Get the location of a stored file, in the same form store returns
+
+        Args:
+            relative_path (str): Path relative to the sink root
+
+        Returns:
+            str: Location of the file
+        """
+        return relative_path
+
+    def store(self, source_path: str, relative_path: str) -> str:
+        """
+        Move a fully written file into the sink under its final name
+
+        May be called from several threads at once with different names.
+
+        Args:
+            source_path (str): Path of the complete file in the staging area
+            relative_path (str): Final path relative to the sink root
+
+        Returns:
+            str: Location of the stored file
+        """
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Flush any pending data"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class LocalSink(StorageSink):
+    """Store files as regular files below a root directory"""
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+
+    def exists(self, relative_path: str) -> bool:
+        return os.path.exists(os.path.join(self.root, relative_path))
+
+    def locate(self, relative_path: str) -> str:
+        return os.path.join(self.root, relative_path)
+
+    def store(self, source_path: str, relative_path: str) -> str:
+        final_path = os.path.join(self.root, relative_path)
+        os.makedirs(os.path.dirname(final_path) or self.root, exist_ok=True)
+        try:
+            # Atomic when staging and destination share a filesystem
+            os.replace(source_path, final_path)
+        except OSError:
+            # Different filesystem: copy next to the target, then swap in
+            temp_path = final_path + '.part'
+            shutil.copy2(source_path, temp_path)
+            os.replace(temp_path, final_path)
+            os.remove(source_path)
+        return final_path
+
+
+class ArchiveShardSink(StorageSink):
+    """
+    Append files to tar or zip shards holding up to shard_size files each
+
+    The shard being filled is written as <name>.part and only renamed to its
+    final name once it is full or the sink is closed, so a complete shard
+    never shows up half written. Member names of the finished shards from
+    earlier runs are indexed on open, so re-runs don't store duplicates;
+    leftover .part shards of an interrupted run are not indexed.
+    """
+
+    def __init__(self, root: str, archive_format: str = 'tar', shard_size: int = 1000):
+        if archive_format not in ('tar', 'zip'):
+            raise ValueError(f"Unknown archive format: {archive_format}")
+        self.root = root
+        self.archive_format = archive_format
+        self.shard_size = max(1, shard_size)
+        self.archive = None
+        self.count = 0
+        # Member name -> shard holding it
+        self.names: Dict[str, str] = {}
+        # Only one member can be appended to a shard at a time
+        self.lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+        self.shard_index = self._index_existing_shards()
+
+    def _shard_path(self, index: int) -> str:
+        return os.path.join(self.root, f"shard_{index:05d}.{self.archive_format}")
+
+    def _index_existing_shards(self) -> int:
+        """
+        Record the members of shards written by previous runs
+
+        Returns:
+            int: First shard index not used by a previous run
+        """
+        index = 0
+        while True:
+            path = self._shard_path(index)
+            if os.path.exists(path):
+                try:
+                    if self.archive_format == 'tar':
+                        with tarfile.open(path, 'r') as archive:
+                            members = archive.getnames()
+                    else:
+                        with zipfile.ZipFile(path, 'r') as archive:
+                            members = archive.namelist()
+                    for name in members:
+                        self.names[name] = path
+                except (tarfile.TarError, zipfile.BadZipFile, OSError) as e:
+                    print(f"Warning: Could not index shard {path}: {str(e)}")
+            elif not os.path.exists(path + '.part'):
+                return index
+            index += 1
+
+    def _open_shard(self) -> None:
+        path = self._shard_path(self.shard_index) + '.part'
+        if self.archive_format == 'tar':
+            self.archive = tarfile.open(path, 'w')
+        else:
+            self.archive = zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_STORED, allowZip64=True)
+        self.count = 0
+
+    def _finish_shard(self) -> None:
+        if self.archive is None:
+            return
+        self.archive.close()
+        final_path = self._shard_path(self.shard_index)
+        os.replace(final_path + '.part', final_path)
+        self.archive = None
+        self.shard_index += 1
+
+    def exists(self, relative_path: str) -> bool:
+        return relative_path.replace(os.sep, '/') in self.names
+
+    def locate(self, relative_path: str) -> str:
+        arcname = relative_path.replace(os.sep, '/')
+        shard = self.names.get(arcname, self._shard_path(self.shard_index))
+        return f"{shard}:{arcname}"
+
+    def store(self, source_path: str, relative_path: str) -> str:
+        arcname = relative_path.replace(os.sep, '/')
+        with self.lock:
+            if self.archive is None:
+                self._open_shard()
+            if self.archive_format == 'tar':
+                self.archive.add(source_path, arcname=arcname)
+            else:
+                self.archive.write(source_path, arcname=arcname)
+            shard = self._shard_path(self.shard_index)
+            self.names[arcname] = shard
+            self.count += 1
+            if self.count >= self.shard_size:
+                self._finish_shard()
+        os.remove(source_path)
+        return f"{shard}:{arcname}"
+
+    def close(self) -> None:
+        with self.lock:
+            self._finish_shard()
+
+
+class S3Sink(StorageSink):
+    """
+    Upload files to an S3-compatible bucket
+
+    endpoint_url lets the sink target MinIO or any other local stand-in.
+    Objects only become visible once the upload completes, so there is no
+    partial-write window.
+    """
+
+    def __init__(self, bucket: str, prefix: str = '', endpoint_url: Optional[str] = None):
+        try:
+            import boto3
+            from botocore.exceptions import ClientError
+        except ImportError:
+            raise ImportError("The s3 sink requires boto3 (pip install boto3)")
+        self.client_error = ClientError
+        self.bucket = bucket
+        self.prefix = prefix.strip('/')
+        self.client = boto3.client('s3', endpoint_url=endpoint_url)
+
+    def _key(self, relative_path: str) -> str:
+        key = relative_path.replace(os.sep, '/')
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def exists(self, relative_path: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(relative_path))
+            return True
+        except self.client_error as e:
+            # Only a missing key means the name is free; auth or bucket errors must surface
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise
+
+    def locate(self, relative_path: str) -> str:
+        return f"s3://{self.bucket}/{self._key(relative_path)}"
+
+    def store(self, source_path: str, relative_path: str) -> str:
+        key = self._key(relative_path)
+        self.client.upload_file(source_path, self.bucket, key)
+        os.remove(source_path)
+        return f"s3://{self.bucket}/{key}"
+
+
+def create_sink(kind: str, save_path: str, shard_size: int = 1000,
+                s3_bucket: Optional[str] = None, s3_prefix: str = '',
+                s3_endpoint: Optional[str] = None) -> StorageSink:
+    """
+    Create a storage sink by name
+
+    Args:
+        kind (str): One of SINKS
+        save_path (str): Root directory for local and archive sinks
+        shard_size (int): Files per archive shard
+        s3_bucket (Optional[str]): Bucket name for the s3 sink
+        s3_prefix (str): Key prefix for the s3 sink
+        s3_endpoint (Optional[str]): Custom endpoint URL for the s3 sink
+
+    Returns:
+        StorageSink: Configured sink
+    """
+    if kind == 'local':
+        return LocalSink(save_path)
+    if kind in ('tar', 'zip'):
+        return ArchiveShardSink(save_path, archive_format=kind, shard_size=shard_size)
+    if kind == 's3':
+        if not s3_bucket:
+            raise ValueError("The s3 sink requires a bucket name")
+        return S3Sink(s3_bucket, prefix=s3_prefix, endpoint_url=s3_endpoint)
+    raise ValueError(f"Unknown storage sink: {kind}")
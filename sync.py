@@ -0,0 +1,201 @@
+import json
+import os
+import re
+from datetime import datetime
+from typing import Optional, Dict, Any, List
+
+import yt_dlp
+
+# Profiles can pin up to three older videos above the newest uploads
+PINNED_VIDEO_LIMIT = 3
+
+# Hashtag listings are unordered and practically endless, so bound each scan
+HASHTAG_DEFAULT_LIMIT = 500
+HASHTAG_OLD_STREAK_LIMIT = 50
+
+
+def is_profile_url(url: str) -> bool:
+    """Check whether a URL points to a TikTok profile"""
+    return bool(re.match(r'https?://(www\.)?tiktok\.com/@[^/?#]+/?(\?.*)?$', url))
+
+
+def is_hashtag_url(url: str) -> bool:
+    """Check whether a URL points to a TikTok hashtag page"""
+    return bool(re.match(r'https?://(www\.)?tiktok\.com/tag/[^/?#]+/?(\?.*)?$', url))
+
+
+def source_key(url: str) -> str:
+    """
+    Normalise a profile or hashtag URL into the key used in the sync state
+
+    Args:
+        url (str): Profile or hashtag URL
+
+    Returns:
+        str: Key such as '@username' or 'tag/name'
+    """
+    match = re.search(r'tiktok\.com/(@[^/?#]+|tag/[^/?#]+)', url)
+    if match:
+        return match.group(1).lower()
+    return url
+
+
+class SyncState:
+    def __init__(self, path: str):
+        """
+        Per-source cursors persisted as JSON
+
+        Args:
+            path (str): Path of the state file
+        """
+        self.path = path
+        self.sources: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r') as f:
+                    self.sources = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Warning: Could not read sync state, starting fresh: {str(e)}")
+
+    def get_cursor(self, key: str) -> int:
+        """Get the newest video ID already synced for a source (0 if never synced)"""
+        return int(self.sources.get(key, {}).get('last_id', 0))
+
+    def update(self, key: str, video_id: Optional[int] = None) -> None:
+        """
+        Record a sync of a source, advancing its cursor when a newer ID is given
+
+        Args:
+            key (str): Source key
+            video_id (Optional[int]): ID of a video that was just synced
+        """
+        entry = self.sources.setdefault(key, {'last_id': 0})
+        if video_id and video_id > int(entry['last_id']):
+            entry['last_id'] = video_id
+        entry['last_sync'] = datetime.now().isoformat(timespec='seconds')
+        self.save()
+
+    def save(self) -> None:
+        """Write the state atomically so a crash never leaves it truncated"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(self.sources, f, indent=2)
+        os.replace(temp_path, self.path)
+
+
+class ProfileSyncer:
+    def __init__(self, downloader, state_path: Optional[str] = None, max_items: Optional[int] = None):
+        """
+        Mirror profiles and hashtags, only fetching videos newer than the last sync
+
+        Args:
+            downloader (TikTokDownloader): Downloader used for the videos
+            state_path (Optional[str]): Sync state file, inside the save path by default
+            max_items (Optional[int]): Maximum number of listing entries to inspect per
+                source, HASHTAG_DEFAULT_LIMIT for hashtags when None
+        """
+        self.downloader = downloader
+        self.state = SyncState(state_path or os.path.join(downloader.save_path, '.sync_state.json'))
+        self.max_items = max_items
+
+    def list_new_videos(self, source_url: str) -> List[Dict[str, Any]]:
+        """
+        List the videos of a source that are newer than its cursor
+
+        Only the flat listing is requested, so nothing but listing pages is
+        fetched when there is nothing new. Profiles are listed newest first,
+        which lets the listing stop as soon as it reaches already synced
+        videos. Hashtag pages have no such order, so they are scanned up to
+        max_items (HASHTAG_DEFAULT_LIMIT when unset) and stop after
+        HASHTAG_OLD_STREAK_LIMIT consecutive entries at or below the cursor.
+
+        Args:
+            source_url (str): Profile or hashtag URL
+
+        Returns:
+            List[Dict[str, Any]]: New entries with 'id' and 'url', oldest first
+        """
+        cursor = self.state.get_cursor(source_key(source_url))
+        is_profile = is_profile_url(source_url)
+        max_items = self.max_items
+        old_limit = PINNED_VIDEO_LIMIT
+        if not is_profile:
+            max_items = max_items or HASHTAG_DEFAULT_LIMIT
+            old_limit = HASHTAG_OLD_STREAK_LIMIT
+
+        ydl_opts = self.downloader.get_ydl_options()
+        ydl_opts.update({
+            'noplaylist': False,
+            'quiet': True,
+            'extract_flat': 'in_playlist',
+            'lazy_playlist': True,
+        })
+
+        new_entries = []
+        seen_old = 0
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            info = ydl.extract_info(source_url, download=False, process=False)
+            for index, entry in enumerate(info.get('entries') or []):
+                if max_items and index >= max_items:
+                    break
+                if not entry or not str(entry.get('id', '')).isdigit():
+                    continue
+                video_id = int(entry['id'])
+                if video_id > cursor:
+                    url = entry.get('webpage_url') or entry.get('url')
+                    new_entries.append({'id': video_id, 'url': url})
+                    if not is_profile:
+                        seen_old = 0
+                else:
+                    # Skip past pinned videos (profiles) or a run of old posts
+                    # (hashtags) before concluding we caught up
+                    seen_old += 1
+                    if seen_old > old_limit:
+                        break
+
+        return sorted(new_entries, key=lambda entry: entry['id'])
+
+    def sync(self, source_url: str) -> List[str]:
+        """
+        Download every video of a source published since the last sync
+
+        The cursor advances after each successful download, so an
+        interrupted sync resumes where it stopped. A failed download stops
+        the source so the missing video is retried on the next run.
+
+        Args:
+            source_url (str): Profile or hashtag URL
+
+        Returns:
+            List[str]: Paths of the downloaded files
+        """
+        if not (is_profile_url(source_url) or is_hashtag_url(source_url)):
+            print(f"Error: Not a TikTok profile or hashtag URL: {source_url}")
+            return []
+
+        key = source_key(source_url)
+        try:
+            entries = self.list_new_videos(source_url)
+        except yt_dlp.utils.DownloadError as e:
+            print(f"Error listing {source_url}: {str(e)}")
+            return []
+
+        if not entries:
+            print(f"{key}: up to date")
+            self.state.update(key)
+            return []
+
+        print(f"{key}: {len(entries)} new video(s)")
+        paths = []
+        for entry in entries:
+            print(f"\nDownloading: {entry['url']}")
+            result = self.downloader.download_video(entry['url'])
+            if not result:
+                print(f"Failed to download: {entry['url']}, will retry on next sync")
+                break
+            paths.append(result)
+            self.state.update(key, entry['id'])
+        return paths
@@ -2,12 +2,27 @@ import yt_dlp
 import os
 import re
 import argparse
-from typing import Optional, Dict, Any
+import logging
+import threading
+import uuid
+from typing import Optional, Dict, Any, List, Callable
 from datetime import datetime
 from tiktok_description import get_tiktok_description_with_cookies
+from quality import QUALITY_PROFILES, QualityProfile, estimate_best_size, human_size
+from manifest import ManifestExporter
+from sync import ProfileSyncer
+from postprocess import OPERATIONS, PostProcessor
+from segmented import SegmentedDownloader
+from verify import IntegrityVerifier
+from tracing import span, traced, tracer
+from storage import LAYOUTS, SINKS, LocalSink, StorageSink, create_sink, extract_video_id, shard_directory
 
 class TikTokDownloader:
-    def __init__(self, save_path: str = 'tiktok_videos', cookies: Optional[str] = None, use_description: bool = False):
+    def __init__(self, save_path: str = 'tiktok_videos', cookies: Optional[str] = None, use_description: bool = False,
+                 layout: str = 'flat', sink: Optional[StorageSink] = None,
+                 quality: Optional[QualityProfile] = None, connections: int = 1,
+                 segment_size: int = 4 * 1024 * 1024, postprocessor: Optional[PostProcessor] = None,
+                 quiet: bool = False):
         """
         Initialize TikTok downloader with configurable save path and optional cookies
         
@@ -15,16 +30,62 @@ class TikTokDownloader:
             save_path (str): Directory where videos will be saved
             cookies (Optional[str]): Path to cookies.txt file
             use_description (bool): Use video description as filename
+            layout (str): Directory layout for saved videos ('flat', 'id' or 'date')
+            sink (Optional[StorageSink]): Where finished videos are stored, local disk by default
+            quality (Optional[QualityProfile]): Format constraints, 'best' by default
+            connections (int): Concurrent byte-range connections per video, 1 for a single stream
+            segment_size (int): Size in bytes of each byte-range segment
+            postprocessor (Optional[PostProcessor]): ffmpeg jobs run on each downloaded file
+            quiet (bool): Don't print progress and status messages, including the post-processor's
         """
+        if layout not in LAYOUTS:
+            raise ValueError(f"Unknown layout: {layout}")
         self.save_path = save_path
         self.cookies = cookies
         self.use_description = use_description
+        self.layout = layout
+        self.staging_path = os.path.join(self.save_path, '.partial')
         self.create_save_directory()
+        self.sink = sink or LocalSink(self.save_path)
+        if postprocessor and not isinstance(self.sink, LocalSink):
+            raise ValueError("Post-processing requires the local storage sink")
+        self.postprocessor = postprocessor
+        if postprocessor and quiet:
+            postprocessor.quiet = True
+        self.quality = quality or QualityProfile()
+        self.bytes_downloaded = 0
+        self.bytes_best = 0
+        self.connections = connections
+        self.segment_size = segment_size
+        self.quiet = quiet
+        # Guards the counters and picking a free name when used from several threads
+        self.lock = threading.Lock()
+        # Names picked by stores still in progress, so uploads can run outside the lock
+        self.reserved = set()
     
     def create_save_directory(self) -> None:
-        """Create the save directory if it doesn't exist"""
-        if not os.path.exists(self.save_path):
-            os.makedirs(self.save_path)
+        """Create the save directory and its staging area if they don't exist"""
+        if not os.path.exists(self.staging_path):
+            os.makedirs(self.staging_path)
+    
+    def close(self) -> None:
+        """Wait for pending post-processing and flush the storage sink"""
+        if self.postprocessor:
+            self.postprocessor.close()
+        self.sink.close()
+    
+    def log(self, message: str) -> None:
+        """Print a status message unless the downloader is quiet"""
+        if not self.quiet:
+            print(message)
+    
+    def print_transfer_summary(self) -> None:
+        """Print bytes downloaded compared to what the 'best' format would have cost"""
+        if not self.bytes_downloaded:
+            return
+        saved = self.bytes_best - self.bytes_downloaded
+        print(f"\nDownloaded {human_size(self.bytes_downloaded)} "
+              f"('best' would have been {human_size(self.bytes_best)}, saved {human_size(saved)})")
     
     @staticmethod
     def validate_url(url: str) -> bool:
@@ -80,6 +141,7 @@ class TikTokDownloader:
         # Limit length to 255 characters (Windows limit)
         return filename[:255]
     
+    @traced()
     def get_description(self, video_url: str) -> Optional[str]:
         """
         Get video description using Selenium
@@ -96,35 +158,30 @@ class TikTokDownloader:
                 return self.sanitize_filename(description)
         return None
     
-    def rename_with_description(self, file_path: str, description: str) -> str:
+    def get_unique_path(self, filename: str, video_id: Optional[str] = None, unique: bool = True) -> str:
         """
-        Rename file with video description
+        Build the sharded relative path for a file, avoiding name conflicts
         
         Args:
-            file_path (str): Path to the original file
-            description (str): Video description
+            filename (str): Desired filename
+            video_id (Optional[str]): Video ID used by the sharded layouts
+            unique (bool): Add a _N suffix when the name is taken
             
         Returns:
-            str: New file path
+            str: Path relative to the storage sink root
         """
-        directory = os.path.dirname(file_path)
-        extension = os.path.splitext(file_path)[1]
-        new_filename = f"{description}{extension}"
-        new_path = os.path.join(directory, new_filename)
+        directory = shard_directory(filename, self.layout, video_id)
+        stem, extension = os.path.splitext(filename)
+        relative_path = os.path.join(directory, filename)
+        if not unique:
+            return relative_path
         
-        # Handle filename conflicts
+        # Handle filename conflicts, including names reserved by running stores
         counter = 1
-        while os.path.exists(new_path):
-            new_filename = f"{description}_{counter}{extension}"
-            new_path = os.path.join(directory, new_filename)
+        while relative_path in self.reserved or self.sink.exists(relative_path):
+            relative_path = os.path.join(directory, f"{stem}_{counter}{extension}")
             counter += 1
-        
-        try:
-            os.rename(file_path, new_path)
-            return new_path
-        except Exception as e:
-            print(f"Warning: Could not rename file: {str(e)}")
-            return file_path
+        return relative_path
     
     def get_filename(self, video_url: str) -> str:
         """
@@ -139,28 +196,23 @@ class TikTokDownloader:
         tiktok_id = re.search(r'/video/(\d+)', video_url)
         if tiktok_id:
             return f"tiktok_{tiktok_id.group(1)}.mp4"
+        # Short links carry no ID; the random part keeps videos fetched in the same second apart
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        return f"tiktok_{timestamp}.mp4"
+        return f"tiktok_{timestamp}_{uuid.uuid4().hex[:8]}.mp4"
     
-    def download_video(self, video_url: str) -> Optional[str]:
+    def get_ydl_options(self) -> Dict[str, Any]:
         """
-        Download TikTok video
+        Build the yt-dlp options shared by every request to TikTok
         
-        Args:
-            video_url (str): URL of the TikTok video
-            
         Returns:
-            Optional[str]: Path to downloaded file if successful, None otherwise
+            Dict[str, Any]: yt-dlp options with headers and cookies
         """
-        if not self.validate_url(video_url):
-            print("Error: Invalid TikTok URL")
-            return None
-
         ydl_opts = {
-            'format': 'best',
             'noplaylist': True,
-            'quiet': False,
-            'progress_hooks': [self.progress_hook],
+            'quiet': self.quiet,
+            'no_warnings': self.quiet,
+            'noprogress': self.quiet,
+            'progress_hooks': [] if self.quiet else [self.progress_hook],
             'extractor_args': {'tiktok': {'webpage_download': True}},
             'http_headers': {
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
@@ -170,37 +222,203 @@ class TikTokDownloader:
         # Add cookies if provided
         if self.cookies and os.path.exists(self.cookies):
             ydl_opts['cookiefile'] = self.cookies
+        return ydl_opts
+    
+    def download_segmented(self, ydl: yt_dlp.YoutubeDL, video_url: str,
+                           cancel_check: Optional[Callable[[], None]] = None) -> Dict[str, Any]:
+        """
+        Download the selected format over several byte-range connections
+        
+        Falls back to yt-dlp's own downloader when the format isn't a single
+        HTTP resource or the segmented download fails, but not when it was
+        cancelled.
+        
+        Args:
+            ydl (yt_dlp.YoutubeDL): Configured yt-dlp instance
+            video_url (str): URL of the TikTok video
+            cancel_check (Optional[Callable[[], None]]): Raises DownloadCancelled to abort the transfer
+            
+        Returns:
+            Dict[str, Any]: Info dictionary of the downloaded video
+        """
+        info = ydl.extract_info(video_url, download=False)
+        media_url = info.get('url')
+        if media_url and info.get('protocol', 'https') in ('http', 'https') and 'requested_formats' not in info:
+            try:
+                output_path = ydl.prepare_filename(info)
+                segmented = SegmentedDownloader(self.connections, self.segment_size, quiet=self.quiet,
+                                                cancel_check=cancel_check)
+                segmented.download(media_url, output_path, headers=info.get('http_headers'),
+                                   cookies=ydl.cookiejar)
+                return info
+            except yt_dlp.utils.DownloadCancelled:
+                raise
+            except Exception as e:
+                self.log(f"\nSegmented download failed, falling back to yt-dlp: {str(e)}")
+        ydl.process_info(info)
+        return info
+    
+    @traced('download_video')
+    def fetch_video(self, video_url: str, postprocess: bool = True,
+                    progress_hooks: Optional[List[Callable[[Dict[str, Any]], None]]] = None,
+                    cancel_event: Optional[threading.Event] = None) -> Dict[str, Any]:
+        """
+        Download TikTok video, raising on failure
+        
+        Args:
+            video_url (str): URL of the TikTok video
+            postprocess (bool): Queue the file for post-processing if a post-processor is set
+            progress_hooks (Optional[List[Callable]]): Extra yt-dlp progress hooks
+            cancel_event (Optional[threading.Event]): Aborts the transfer once set
+            
+        Returns:
+            Dict[str, Any]: Result with url, id, path, size, description,
+            skipped (True when the video was already stored) and postprocess
+            (Future of the post-processing job, None when there is none)
+            
+        Raises:
+            ValueError: If the URL is not a TikTok URL
+            yt_dlp.utils.DownloadError: If yt-dlp fails to download the video
+            yt_dlp.utils.DownloadCancelled: If cancel_event was set during the transfer
+        """
+        if not self.validate_url(video_url):
+            raise ValueError("Invalid TikTok URL")
+
+        ydl_opts = self.get_ydl_options()
+        self.quality.apply(ydl_opts)
+        if progress_hooks:
+            ydl_opts['progress_hooks'] = ydl_opts['progress_hooks'] + progress_hooks
+        
+        def check_cancelled() -> None:
+            if cancel_event is not None and cancel_event.is_set():
+                raise yt_dlp.utils.DownloadCancelled("Download cancelled")
+        
+        # yt-dlp checks for cancellation on its progress updates, the segmented
+        # downloader between chunks
+        if cancel_event is not None:
+            ydl_opts['progress_hooks'] = ydl_opts['progress_hooks'] + [lambda d: check_cancelled()]
 
+        # Generate initial filename
+        filename = self.get_filename(video_url)
+        video_id = extract_video_id(video_url)
+        
+        # Skip videos already stored under their ID, like yt-dlp does for existing files
+        if video_id:
+            existing_path = self.get_unique_path(filename, video_id, unique=False)
+            if self.sink.exists(existing_path):
+                output_path = self.sink.locate(existing_path)
+                self.log(f"\nVideo already downloaded: {output_path}")
+                return {
+                    'url': video_url,
+                    'id': video_id,
+                    'path': output_path,
+                    'size': 0,
+                    'description': None,
+                    'skipped': True,
+                    'postprocess': None,
+                }
+        
+        # Download into the staging area so partial files never get a final name.
+        # Each call gets its own staging name, so concurrent downloads of the same
+        # URL or of timestamp-named videos never write to the same file.
+        stem, extension = os.path.splitext(filename)
+        staging_path = os.path.join(self.staging_path, f"{stem}.{uuid.uuid4().hex}{extension}")
+        ydl_opts['outtmpl'] = staging_path
+        
         try:
-            # Generate initial filename
-            filename = self.get_filename(video_url)
-            output_path = os.path.join(self.save_path, filename)
+            with span("yt_dlp_download", url=video_url):
+                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                    if self.connections > 1:
+                        info = self.download_segmented(ydl, video_url, check_cancelled)
+                    else:
+                        info = ydl.extract_info(video_url, download=True)
+            info = info or {}
+            return self.commit_video(video_url, video_id, filename, staging_path, info, postprocess)
+        finally:
+            # Nothing is left in the staging area once the video is stored
+            for path in (staging_path, staging_path + '.part'):
+                if os.path.exists(path):
+                    os.remove(path)
+    
+    def commit_video(self, video_url: str, video_id: Optional[str], filename: str, staging_path: str,
+                     info: Dict[str, Any], postprocess: bool) -> Dict[str, Any]:
+        """
+        Name a downloaded video and move it from the staging area into the sink
+        
+        Args:
+            video_url (str): URL of the TikTok video
+            video_id (Optional[str]): Video ID taken from the URL
+            filename (str): ID-derived filename
+            staging_path (str): Path of the complete download in the staging area
+            info (Dict[str, Any]): Info dictionary returned by yt-dlp
+            postprocess (bool): Queue the file for post-processing if a post-processor is set
             
-            # Update outtmpl with the final filename
-            ydl_opts['outtmpl'] = output_path
+        Returns:
+            Dict[str, Any]: Result as returned by fetch_video
+        """
+        # Keep track of the transfer compared to the 'best' format,
+        # counting the actual size when yt-dlp doesn't report one
+        size = os.path.getsize(staging_path)
+        with self.lock:
+            self.bytes_downloaded += size
+            self.bytes_best += estimate_best_size(info) or size
+        
+        # If description naming is enabled, try to use it as the final name
+        message = "Video successfully downloaded"
+        description = None
+        # ID names always map to the same video; description and ID-less names
+        # can be shared by different videos, so they get a _N suffix when taken
+        unique = video_id is None
+        if self.use_description:
+            description = self.get_description(video_url)
+            if description:
+                unique = True
+                filename = f"{description}{os.path.splitext(filename)[1]}"
+                message = "Video successfully downloaded and renamed"
+            else:
+                message = "Video successfully downloaded (could not get description)"
+        
+        # Only picking the name is serialised, the store itself (e.g. an S3 upload) runs in parallel
+        with self.lock:
+            relative_path = self.get_unique_path(filename, video_id, unique)
+            self.reserved.add(relative_path)
+        try:
+            with span("store", filename=filename):
+                output_path = self.sink.store(staging_path, relative_path)
+        finally:
+            with self.lock:
+                self.reserved.discard(relative_path)
+        self.log(f"\n{message}: {output_path}")
+        
+        # Post-processing runs in the background while the next download starts
+        postprocess_future = None
+        if self.postprocessor and postprocess:
+            postprocess_future = self.postprocessor.submit(output_path)
+        return {
+            'url': video_url,
+            'id': info.get('id') or video_id,
+            'path': output_path,
+            'size': size,
+            'description': description or info.get('description'),
+            'skipped': False,
+            'postprocess': postprocess_future,
+        }
+    
+    def download_video(self, video_url: str, postprocess: bool = True) -> Optional[str]:
+        """
+        Download TikTok video
+        
+        Args:
+            video_url (str): URL of the TikTok video
+            postprocess (bool): Queue the file for post-processing if a post-processor is set
             
-            # Download the video
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([video_url])
-                
-                # If description naming is enabled, try to rename the file
-                if self.use_description:
-                    description = self.get_description(video_url)
-                    if description:
-                        new_path = self.rename_with_description(output_path, description)
-                        if new_path != output_path:
-                            print(f"\nVideo successfully downloaded and renamed: {new_path}")
-                            return new_path
-                        else:
-                            print(f"\nVideo successfully downloaded (could not rename): {output_path}")
-                            return output_path
-                    else:
-                        print(f"\nVideo successfully downloaded (could not get description): {output_path}")
-                        return output_path
-                
-                print(f"\nVideo successfully downloaded: {output_path}")
-                return output_path
-                
+        Returns:
+            Optional[str]: Path to downloaded file if successful, None otherwise
+        """
+        try:
+            return self.fetch_video(video_url, postprocess)['path']
+        except ValueError as e:
+            print(f"Error: {str(e)}")
         except yt_dlp.utils.DownloadError as e:
             print(f"Error downloading video: {str(e)}")
         except Exception as e:
@@ -217,15 +435,50 @@ def main():
     parser.add_argument('--file', '-f', help="Text file containing TikTok URLs (one per line)")
     parser.add_argument('--use-description', '-d', action='store_true',
                        help="Use video description as filename instead of TikTok ID")
+    parser.add_argument('--layout', choices=LAYOUTS, default='flat',
+                       help="Directory layout: flat, sharded by video ID, or by upload date")
+    parser.add_argument('--sink', choices=SINKS, default='local',
+                       help="Storage for finished videos: local files, tar/zip shards or an S3 bucket")
+    parser.add_argument('--shard-size', type=int, default=1000,
+                       help="Number of videos per tar/zip shard")
+    parser.add_argument('--s3-bucket', help="Bucket name for the s3 sink")
+    parser.add_argument('--s3-prefix', default='', help="Key prefix for the s3 sink")
+    parser.add_argument('--s3-endpoint', help="Endpoint URL for S3-compatible storage (e.g. MinIO)")
+    parser.add_argument('--quality', '-q', choices=list(QUALITY_PROFILES), default='best',
+                       help="Quality profile used to select the video format")
+    parser.add_argument('--max-height', type=int, help="Maximum video height in pixels")
+    parser.add_argument('--max-bitrate', type=int, help="Maximum total bitrate (video + audio) in kbps")
+    parser.add_argument('--max-filesize', type=float, help="Maximum file size in MB")
+    parser.add_argument('--codec', choices=['h264', 'h265'], help="Preferred video codec")
+    parser.add_argument('--sync', action='store_true',
+                       help="Treat URLs as profiles or hashtags and only download videos newer than the last sync")
+    parser.add_argument('--sync-state', help="Path of the sync state file (default: <output>/.sync_state.json)")
+    parser.add_argument('--sync-limit', type=int, help="Maximum number of videos to inspect per profile or hashtag "
+                            "(hashtags default to 500 and stop after 50 consecutive already synced videos)")
+    parser.add_argument('--metadata-only', action='store_true',
+                       help="Only extract metadata into a JSONL manifest, without downloading videos")
+    parser.add_argument('--manifest', help="Path of the JSONL manifest (default: <output>/manifest.jsonl), "
+                            "'' makes --verify skip the size check")
+    parser.add_argument('--workers', type=int, default=8,
+                       help="Number of concurrent metadata extractions or file checks")
+    parser.add_argument('--trace', help="Write per-stage timing spans as Chrome trace-event JSON to this path")
+    parser.add_argument('--profile', help="Write cProfile statistics for the whole run, worker threads included, to this path")
+    parser.add_argument('--connections', type=int, default=1,
+                       help="Concurrent byte-range connections per video (1 disables segmented download)")
+    parser.add_argument('--segment-size', type=float, default=4,
+                       help="Size in MB of each byte-range segment")
+    parser.add_argument('--postprocess', nargs='+', choices=OPERATIONS,
+                       help="ffmpeg jobs to run on each downloaded video in a process pool")
+    parser.add_argument('--pp-workers', type=int,
+                       help="Number of post-processing processes (default: CPU count)")
+    parser.add_argument('--verify', action='store_true',
+                       help="Check existing downloads in the output directory for truncated or corrupt files")
+    parser.add_argument('--redownload', action='store_true',
+                       help="With --verify, download broken files again")
     
     args = parser.parse_args()
-    
-    # Initialize downloader
-    downloader = TikTokDownloader(
-        save_path=args.output,
-        cookies=args.cookies,
-        use_description=args.use_description
-    )
+    # Show the Selenium and ChromeDriver status messages logged by the helper modules
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
     
     # Get URLs from file if provided
     urls = args.urls
@@ -237,16 +490,85 @@ def main():
             print(f"Error reading file: {str(e)}")
             return
     
-    if not urls:
+    if not urls and not args.verify:
         print("No URLs provided. Use --help for usage information.")
         return
     
+    if args.trace:
+        tracer.enabled = True
+    if args.profile:
+        tracer.start_profile()
+    
+    postprocessor = None
+    try:
+        quality = QualityProfile.from_name(
+            args.quality,
+            max_height=args.max_height,
+            max_bitrate=args.max_bitrate,
+            max_filesize=int(args.max_filesize * 1024 * 1024) if args.max_filesize else None,
+            codec=args.codec
+        )
+        sink = create_sink(args.sink, args.output, shard_size=args.shard_size,
+                           s3_bucket=args.s3_bucket, s3_prefix=args.s3_prefix,
+                           s3_endpoint=args.s3_endpoint)
+        if args.postprocess and not args.metadata_only:
+            if args.sink != 'local':
+                raise ValueError("Post-processing requires the local storage sink")
+            postprocessor = PostProcessor(args.postprocess, workers=args.pp_workers)
+    except (ValueError, ImportError, RuntimeError) as e:
+        print(f"Error: {str(e)}")
+        return
+    
+    # Initialize downloader
+    downloader = TikTokDownloader(
+        save_path=args.output,
+        cookies=args.cookies,
+        use_description=args.use_description,
+        layout=args.layout,
+        sink=sink,
+        quality=quality,
+        connections=args.connections,
+        segment_size=int(args.segment_size * 1024 * 1024),
+        postprocessor=postprocessor
+    )
+    
+    # --metadata-only writes the manifest here, and --verify reads expected sizes from it if present
+    manifest_path = args.manifest or os.path.join(args.output, 'manifest.jsonl')
+    
     # Download videos
-    for url in urls:
-        print(f"\nDownloading: {url}")
-        result = downloader.download_video(url)
-        if not result:
-            print(f"Failed to download: {url}")
+    try:
+        if args.verify:
+            # An explicitly empty --manifest skips the size check, e.g. for post-processed files
+            verifier = IntegrityVerifier(args.output, manifest_path=manifest_path if args.manifest != '' else None,
+                                         workers=args.workers)
+            broken = verifier.verify()
+            if broken:
+                broken_list = os.path.join(args.output, 'broken.txt')
+                with open(broken_list, 'w') as f:
+                    f.writelines(f"{result['url']}\n" for result in broken if result['url'])
+                print(f"URLs of broken files written to {broken_list}")
+                if args.redownload:
+                    verifier.redownload(downloader, broken)
+        elif args.metadata_only:
+            ManifestExporter(downloader, workers=args.workers).export(urls, manifest_path)
+        elif args.sync:
+            syncer = ProfileSyncer(downloader, state_path=args.sync_state, max_items=args.sync_limit)
+            for url in urls:
+                print(f"\nSyncing: {url}")
+                syncer.sync(url)
+        else:
+            for url in urls:
+                print(f"\nDownloading: {url}")
+                result = downloader.download_video(url)
+                if not result:
+                    print(f"Failed to download: {url}")
+    finally:
+        downloader.close()
+        if args.profile:
+            tracer.stop_profile(args.profile)
+        if args.trace:
+            tracer.export_chrome_trace(args.trace)
+    downloader.print_transfer_summary()
 
 if __name__ == "__main__":
     main()
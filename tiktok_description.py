@@ -2,11 +2,17 @@ from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
+import logging
 import time
 import os
 import platform
 import sys
 from chromedriver_manager import ensure_compatible_chromedriver
+from tracing import span, traced
+
+# Library module: output only shows up once the application configures logging
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
 
 def get_chromedriver_path():
     """
@@ -51,6 +57,7 @@ def load_cookies_from_file(driver, cookie_file, url):
                 }
                 driver.add_cookie(cookie)
 
+@traced()
 def get_tiktok_description_with_cookies(url, cookie_file):
     """
     Get TikTok video description using Selenium and cookies
@@ -77,20 +84,24 @@ def get_tiktok_description_with_cookies(url, cookie_file):
     try:
         driver_path = get_chromedriver_path()
         if not os.path.exists(driver_path):
-            print("ChromeDriver not found at path:", driver_path)
+            logger.warning(f"ChromeDriver not found at path: {driver_path}")
             return None
         
-        service = Service(driver_path)
-        driver = webdriver.Chrome(service=service, options=options)
+        with span("chrome_startup"):
+            service = Service(driver_path)
+            driver = webdriver.Chrome(service=service, options=options)
 
         # Load cookies
-        driver.get("https://www.tiktok.com")
-        load_cookies_from_file(driver, cookie_file, "https://www.tiktok.com")
+        with span("load_cookies"):
+            driver.get("https://www.tiktok.com")
+            load_cookies_from_file(driver, cookie_file, "https://www.tiktok.com")
 
         # Navigate to the video
-        print(f"Navigating to {url} to extract description")
-        driver.get(url)
-        time.sleep(8)  # Increased wait time for page to load
+        logger.info(f"Navigating to {url} to extract description")
+        with span("navigate", url=url):
+            driver.get(url)
+        with span("page_load_wait"):
+            time.sleep(8)  # Increased wait time for page to load
 
         # Try multiple selectors to find the description element
         selectors = [
@@ -104,49 +115,52 @@ def get_tiktok_description_with_cookies(url, cookie_file):
         ]
         
         description = None
-        for selector in selectors:
-            try:
-                print(f"Trying selector: {selector}")
-                elements = driver.find_elements(By.CSS_SELECTOR, selector)
-                if elements:
-                    for element in elements:
-                        text = element.text.strip()
-                        if text and len(text) > 5:  # Ensure we have meaningful text
-                            print(f"Found description with selector {selector}: {text[:30]}...")
-                            description = text
-                            break
-                if description:
-                    break
-            except Exception as e:
-                print(f"Error with selector {selector}: {str(e)}")
-                continue
+        with span("selector_probing"):
+            for selector in selectors:
+                try:
+                    logger.info(f"Trying selector: {selector}")
+                    elements = driver.find_elements(By.CSS_SELECTOR, selector)
+                    if elements:
+                        for element in elements:
+                            text = element.text.strip()
+                            if text and len(text) > 5:  # Ensure we have meaningful text
+                                logger.info(f"Found description with selector {selector}: {text[:30]}...")
+                                description = text
+                                break
+                    if description:
+                        break
+                except Exception as e:
+                    logger.warning(f"Error with selector {selector}: {str(e)}")
+                    continue
         
         # If no description found with selectors, try getting page source and extracting
         if not description:
-            try:
-                print("Trying to extract from page source")
-                page_source = driver.page_source
-                # Look for common patterns in the HTML that might contain the description
-                import re
-                desc_patterns = [
-                    r'"desc":"([^"]+)"',
-                    r'"description":"([^"]+)"',
-                    r'"caption":"([^"]+)"'
-                ]
+            with span("page_source_extraction"):
+                try:
+                    logger.info("Trying to extract from page source")
+                    page_source = driver.page_source
+                    # Look for common patterns in the HTML that might contain the description
+                    import re
+                    desc_patterns = [
+                        r'"desc":"([^"]+)"',
+                        r'"description":"([^"]+)"',
+                        r'"caption":"([^"]+)"'
+                    ]
                 
-                for pattern in desc_patterns:
-                    matches = re.findall(pattern, page_source)
-                    if matches:
-                        description = matches[0]
-                        print(f"Found description in page source: {description[:30]}...")
-                        break
-            except Exception as e:
-                print(f"Error extracting from page source: {str(e)}")
+                    for pattern in desc_patterns:
+                        matches = re.findall(pattern, page_source)
+                        if matches:
+                            description = matches[0]
+                            logger.info(f"Found description in page source: {description[:30]}...")
+                            break
+                except Exception as e:
+                    logger.warning(f"Error extracting from page source: {str(e)}")
         
         return description
     except Exception as e:
-        print(f"Error in get_tiktok_description_with_cookies: {str(e)}")
+        logger.warning(f"Error in get_tiktok_description_with_cookies: {str(e)}")
         return None
     finally:
         if 'driver' in locals():
-            driver.quit()
+            with span("chrome_shutdown"):
+                driver.quit()
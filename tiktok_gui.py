@@ -3,6 +3,7 @@ from tkinter import filedialog, messagebox, scrolledtext, ttk
 from tik_tok_downloader import TikTokDownloader
 from typing import List
 import threading
+import logging
 import os
 
 class TikTokDownloaderGUI:
@@ -223,6 +224,7 @@ class TikTokDownloaderGUI:
             self.stop_btn.config(state=tk.DISABLED)
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
     root = tk.Tk()
     app = TikTokDownloaderGUI(root)
     root.mainloop()
@@ -0,0 +1,157 @@
+import cProfile
+import functools
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, List
+
+
+class _NullSpan:
+    """Shared no-op context manager returned while tracing is disabled"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    def __init__(self):
+        """Collect timed spans and export them as Chrome trace events"""
+        self.enabled = False
+        self.events: List[Dict[str, Any]] = []
+        self.lock = threading.Lock()
+        self.profiler: Optional[cProfile.Profile] = None
+        # Profilers of the worker threads started during the session
+        self.thread_profilers: List[cProfile.Profile] = []
+
+    def span(self, name: str, category: str = 'tiktok', **args):
+        """
+        Time a block of code
+
+        Args:
+            name (str): Span name shown in the trace viewer
+            category (str): Trace event category
+            **args: Extra values attached to the span
+
+        Returns:
+            Context manager recording the span when tracing is enabled
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return self._record(name, category, args)
+
+    @contextmanager
+    def _record(self, name: str, category: str, args: Dict[str, Any]):
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            end = time.perf_counter_ns()
+            event = {
+                'name': name,
+                'cat': category,
+                'ph': 'X',
+                'ts': start / 1000,
+                'dur': (end - start) / 1000,
+                'pid': os.getpid(),
+                'tid': threading.get_ident(),
+                'args': {key: str(value) for key, value in args.items()},
+            }
+            with self.lock:
+                self.events.append(event)
+
+    def export_chrome_trace(self, path: str) -> None:
+        """
+        Write the recorded spans in Chrome trace-event format
+
+        The file can be opened in chrome://tracing or https://ui.perfetto.dev
+
+        Args:
+            path (str): Output JSON path
+        """
+        with self.lock:
+            events = list(self.events)
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+        print(f"Trace with {len(events)} spans written to {path}")
+
+    def _profile_thread(self, frame, event, arg) -> None:
+        """Profile hook run once in each new thread, replacing itself with a cProfile session"""
+        profiler = cProfile.Profile()
+        with self.lock:
+            self.thread_profilers.append(profiler)
+        profiler.enable()
+
+    def start_profile(self) -> None:
+        """
+        Start a cProfile session for the whole run
+
+        Before Python 3.12 a profiler only sees the thread that enabled it,
+        so threads started afterwards (metadata workers, segment downloads)
+        get their own profiler through threading.setprofile, merged in
+        stop_profile. From 3.12 on cProfile covers every thread by itself.
+        """
+        self.thread_profilers = []
+        if sys.version_info < (3, 12):
+            threading.setprofile(self._profile_thread)
+        self.profiler = cProfile.Profile()
+        self.profiler.enable()
+
+    def stop_profile(self, path: str) -> None:
+        """
+        Stop the cProfile session and dump the statistics of all threads
+
+        Args:
+            path (str): Output path, readable with pstats or snakeviz
+        """
+        if self.profiler is None:
+            return
+        self.profiler.disable()
+        threading.setprofile(None)
+        stats = pstats.Stats(self.profiler)
+        with self.lock:
+            thread_profilers, self.thread_profilers = self.thread_profilers, []
+        for profiler in thread_profilers:
+            profiler.create_stats()
+            # Threads that never returned from a profiled call have no stats
+            if profiler.stats:
+                stats.add(profiler)
+        stats.dump_stats(path)
+        self.profiler = None
+        print(f"Profile written to {path} ({len(thread_profilers)} worker thread(s) merged)")
+
+tracer = Tracer()
+
+
+def span(name: str, **args):
+    """Time a block of code with the global tracer"""
+    return tracer.span(name, **args)
+
+
+def traced(name: Optional[str] = None):
+    """
+    Decorator timing every call of a function with the global tracer
+
+    Args:
+        name (Optional[str]): Span name, the function name by default
+    """
+    def decorator(func):
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return func(*args, **kwargs)
+            with tracer.span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
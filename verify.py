@@ -0,0 +1,185 @@
+import json
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List, Iterator
+
+from storage import extract_video_id
+
+VIDEO_EXTENSIONS = ('.mp4', '.m4v', '.mov')
+
+
+def check_mp4(file_path: str, expected_size: Optional[int] = None) -> Optional[str]:
+    """
+    Check that an MP4 file is complete by walking its top-level boxes
+
+    Only the 8 or 16 byte box headers are read, seeking over the payloads,
+    so the check costs a handful of small reads regardless of file size.
+    A truncated download shows up as a box running past the end of the
+    file, or as a missing moov or mdat box.
+
+    Args:
+        file_path (str): Path of the video
+        expected_size (Optional[int]): Exact size from metadata, if known
+
+    Returns:
+        Optional[str]: Description of the problem, None if the file looks complete
+    """
+    file_size = os.path.getsize(file_path)
+    if file_size == 0:
+        return "empty file"
+    if expected_size and file_size != expected_size:
+        return f"size {file_size} differs from expected {expected_size}"
+
+    boxes = set()
+    offset = 0
+    with open(file_path, 'rb') as f:
+        while offset < file_size:
+            f.seek(offset)
+            header = f.read(8)
+            if len(header) < 8:
+                return f"truncated box header at offset {offset}"
+            size, box_type = struct.unpack('>I4s', header)
+            header_size = 8
+            if size == 1:
+                large = f.read(8)
+                if len(large) < 8:
+                    return f"truncated box header at offset {offset}"
+                size = struct.unpack('>Q', large)[0]
+                header_size = 16
+            elif size == 0:
+                # Box extends to the end of the file
+                size = file_size - offset
+            if size < header_size:
+                return f"invalid size {size} for box {box_type!r} at offset {offset}"
+            if offset + size > file_size:
+                return f"box {box_type.decode('latin-1')} at offset {offset} runs {offset + size - file_size} bytes past end of file"
+            boxes.add(box_type)
+            offset += size
+
+    if b'ftyp' not in boxes:
+        return "missing ftyp box"
+    if b'moov' not in boxes:
+        return "missing moov box"
+    if b'mdat' not in boxes:
+        return "missing mdat box"
+    return None
+
+
+def load_expected_sizes(manifest_path: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Read video IDs, URLs and exact sizes from a JSONL manifest
+
+    Args:
+        manifest_path (str): Manifest written by --metadata-only
+
+    Returns:
+        Dict[str, Dict[str, Any]]: Records keyed by video ID
+    """
+    records = {}
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get('id') and not record.get('error'):
+                records[str(record['id'])] = record
+    return records
+
+
+def iter_videos(root: str) -> Iterator[str]:
+    """Yield every video file below root, skipping the staging area"""
+    for directory, subdirectories, files in os.walk(root):
+        subdirectories[:] = [name for name in subdirectories if not name.startswith('.')]
+        for name in files:
+            if name.lower().endswith(VIDEO_EXTENSIONS):
+                yield os.path.join(directory, name)
+
+
+class IntegrityVerifier:
+    def __init__(self, save_path: str, manifest_path: Optional[str] = None, workers: int = 8):
+        """
+        Find truncated or corrupt downloads without decoding them
+
+        Args:
+            save_path (str): Directory holding the downloads
+            manifest_path (Optional[str]): JSONL manifest with expected sizes and URLs
+            workers (int): Number of files checked concurrently
+        """
+        self.save_path = save_path
+        self.workers = max(1, workers)
+        self.records = load_expected_sizes(manifest_path) if manifest_path and os.path.exists(manifest_path) else {}
+
+    def check(self, file_path: str) -> Dict[str, Any]:
+        """
+        Check one file
+
+        Args:
+            file_path (str): Path of the video
+
+        Returns:
+            Dict[str, Any]: Result with path, video ID, URL and problem (None when valid)
+        """
+        video_id = extract_video_id(os.path.basename(file_path))
+        record = self.records.get(video_id, {}) if video_id else {}
+        expected_size = record.get('size_estimate') if record.get('size_is_exact') else None
+        try:
+            problem = check_mp4(file_path, expected_size)
+        except OSError as e:
+            problem = str(e)
+        url = record.get('url')
+        if not url and video_id:
+            url = f"https://www.tiktok.com/@_/video/{video_id}"
+        return {'path': file_path, 'id': video_id, 'url': url, 'problem': problem}
+
+    def verify(self) -> List[Dict[str, Any]]:
+        """
+        Check every video in the save path in parallel
+
+        Returns:
+            List[Dict[str, Any]]: Results of the broken files
+        """
+        broken = []
+        checked = 0
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for result in executor.map(self.check, iter_videos(self.save_path)):
+                checked += 1
+                if result['problem']:
+                    broken.append(result)
+                    print(f"\nBroken: {result['path']}: {result['problem']}")
+                if checked % 1000 == 0:
+                    print(f"Verified {checked} files, {len(broken)} broken", end='\r')
+        print(f"\nVerified {checked} files, {len(broken)} broken")
+        return broken
+
+    def redownload(self, downloader, broken: List[Dict[str, Any]]) -> int:
+        """
+        Download broken files again, replacing them once the new copy is stored
+
+        The broken file is moved aside during the download and restored if
+        the download fails, so nothing is lost when TikTok is unreachable.
+
+        Args:
+            downloader (TikTokDownloader): Downloader used for the new copies
+            broken (List[Dict[str, Any]]): Results returned by verify
+
+        Returns:
+            int: Number of files that could not be fetched again
+        """
+        failures = 0
+        for result in broken:
+            if not result['url']:
+                print(f"Cannot re-download {result['path']}: no video ID or URL known")
+                failures += 1
+                continue
+            aside_path = result['path'] + '.broken'
+            os.replace(result['path'], aside_path)
+            print(f"\nRe-downloading: {result['url']}")
+            if downloader.download_video(result['url']):
+                os.remove(aside_path)
+            else:
+                os.replace(aside_path, result['path'])
+                print(f"Failed to download: {result['url']}")
+                failures += 1
+        return failures